@@ -0,0 +1,289 @@
+"""Local HTTP batch API for hierarchy detection and final job title generation.
+
+Runs fully locally on top of tornado (shipped with streamlit). Batches are parsed
+and processed in a process pool so the event loop stays responsive. The worker
+returns the result table, which the server then encodes and flushes to the
+client in chunks, so the first rows go out before the whole response is
+serialized.
+
+    python api.py --port 8600 --workers 4 --band-reference bands.csv
+
+Endpoints:
+    POST /v1/titles      rows with DIVISION, PSL (and optionally PERNR, JOB_CODE, JOB_TEXT, SAL_BAND)
+    POST /v1/hierarchy   rows with JOB_TEXT and/or SAL_BAND
+    GET  /v1/health      liveness check
+    GET  /v1/metrics     request counts and p50/p95/p99 latency over recent requests
+
+Request bodies are either JSON (a list of row objects, or {"rows": [...]}) or
+CSV (Content-Type: text/csv). Responses are JSON by default, or CSV when the
+request sends Accept: text/csv. Query parameters:
+    auto_detect=false    skip JOB_TEXT detection and apply default_level to every row
+    default_level=...    hierarchy level used when detection is off (default Specialist)
+
+With --band-reference (a CSV of SAL_BAND,HIERARCHY_LEVEL), rows with a known
+SAL_BAND take their level from it and the JOB_TEXT rules only cover the rest.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import tornado.httpserver
+import tornado.web
+
+from importer import read_csv_extract
+from job_titles import HIERARCHY_LEVELS, DEFAULT_LEVEL, detect_hierarchy, find_column, generate_titles, load_band_reference
+
+# Number of result rows serialized into each streamed chunk
+CHUNK_ROWS = 1000
+
+# Number of recent requests kept for latency percentiles
+LATENCY_WINDOW = 10000
+
+
+class BatchError(Exception):
+    """Raised by batch workers for client errors; carries the HTTP status to return"""
+
+    def __init__(self, status, message):
+        super().__init__(status, message)
+        self.status = status
+        self.message = message
+
+
+def json_cell_to_str(value):
+    """Converts a JSON value to the string used in the batch; missing values become empty"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    return str(value)
+
+
+def parse_rows(body, content_type, max_rows):
+    """Parses a JSON or CSV request body into a DataFrame of strings"""
+    try:
+        if content_type == "text/csv":
+            data = pd.read_csv(io.BytesIO(body), dtype=str, keep_default_na=False)
+        elif content_type in ("application/json", ""):
+            payload = json.loads(body)
+            if isinstance(payload, dict):
+                payload = payload.get("rows")
+            if not isinstance(payload, list):
+                raise BatchError(400, "JSON body must be a list of rows or an object with a 'rows' list")
+            # Build as object so numbers aren't coerced to float when other rows lack the key
+            data = pd.DataFrame(payload, dtype=object).map(json_cell_to_str)
+        else:
+            raise BatchError(415, f"Unsupported content type: {content_type}")
+    except (ValueError, pd.errors.ParserError) as e:
+        raise BatchError(400, f"Could not parse request body: {e}")
+
+    if len(data) > max_rows:
+        raise BatchError(413, f"Batch has {len(data)} rows; the limit is {max_rows}")
+
+    # Normalize known column names (case insensitive)
+    for name in ["PERNR", "JOB_TEXT", "DIVISION", "PSL", "SUBPSL", "SAL_BAND", "JOB_CODE"]:
+        col = find_column(data, name)
+        if col is not None and col != name:
+            data = data.rename(columns={col: name})
+
+    if data.columns.duplicated().any():
+        raise BatchError(400, "Duplicate column names (column names are case insensitive)")
+
+    return data
+
+
+def encode_chunks(result, output_format):
+    """Serializes a result DataFrame into byte chunks of CHUNK_ROWS rows, one at a time"""
+    for start in range(0, max(len(result), 1), CHUNK_ROWS):
+        part = result.iloc[start:start + CHUNK_ROWS]
+        if output_format == "csv":
+            yield part.to_csv(index=False, header=(start == 0)).encode("utf-8")
+        else:
+            records = part.to_json(orient="records", force_ascii=False)[1:-1]
+            prefix = '{"count": %d, "rows": [' % len(result) if start == 0 else ","
+            yield (prefix + records).encode("utf-8")
+    if output_format != "csv":
+        yield b"]}"
+
+
+def run_titles_batch(body, content_type, use_auto_detection, default_level, max_rows, band_levels):
+    """Worker entry point for /v1/titles"""
+    data = parse_rows(body, content_type, max_rows)
+
+    missing_columns = [col for col in ["DIVISION", "PSL"] if col not in data.columns]
+    if missing_columns:
+        raise BatchError(400, f"Missing required columns: {', '.join(missing_columns)}")
+
+    titles = generate_titles(data, use_auto_detection, default_level, band_levels)
+
+    result = pd.DataFrame(index=data.index)
+    for col in ["PERNR", "JOB_CODE"]:
+        if col in data.columns:
+            result[col] = data[col]
+    result['Division'] = data['DIVISION']
+    result['Subdivision'] = data['PSL']
+    for col in ["SUBPSL", "SAL_BAND"]:
+        if col in data.columns:
+            result[col] = data[col]
+    result['Job Title'] = titles['Detected Hierarchy']
+    result['Hierarchy Source'] = titles['Hierarchy Source']
+    result['Final Job Title'] = titles['Final Job Title']
+
+    return result
+
+
+def run_hierarchy_batch(body, content_type, use_auto_detection, default_level, max_rows, band_levels):
+    """Worker entry point for /v1/hierarchy"""
+    data = parse_rows(body, content_type, max_rows)
+
+    if "JOB_TEXT" not in data.columns and "SAL_BAND" not in data.columns:
+        raise BatchError(400, "Missing required column: JOB_TEXT or SAL_BAND")
+
+    hierarchy, source = detect_hierarchy(data, use_auto_detection, default_level, band_levels)
+
+    result = pd.DataFrame(index=data.index)
+    for col in ["PERNR", "JOB_TEXT", "SAL_BAND"]:
+        if col in data.columns:
+            result[col] = data[col]
+    result['Job Title'] = hierarchy
+    result['Hierarchy Source'] = source
+
+    return result
+
+
+class LatencyTracker:
+    """Keeps recent request latencies and reports percentiles"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.total_requests = 0
+        self.total_errors = 0
+
+    def record(self, seconds, failed):
+        self.samples.append(seconds)
+        self.total_requests += 1
+        if failed:
+            self.total_errors += 1
+
+    def summary(self):
+        ordered = sorted(self.samples)
+
+        def percentile(p):
+            if not ordered:
+                return None
+            index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+            return round(ordered[index] * 1000, 2)
+
+        return {
+            'requests': self.total_requests,
+            'errors': self.total_errors,
+            'window': len(ordered),
+            'p50_ms': percentile(50),
+            'p95_ms': percentile(95),
+            'p99_ms': percentile(99),
+        }
+
+
+class BatchHandler(tornado.web.RequestHandler):
+    """Runs a batch function in the worker pool and writes the result in chunks"""
+
+    def initialize(self, batch_fn, executor, tracker, max_rows, band_levels):
+        self.batch_fn = batch_fn
+        self.executor = executor
+        self.tracker = tracker
+        self.max_rows = max_rows
+        self.band_levels = band_levels
+
+    async def post(self):
+        started = time.perf_counter()
+        failed = True
+        try:
+            content_type = self.request.headers.get("Content-Type", "").split(";")[0].strip().lower()
+            output_format = "csv" if "text/csv" in self.request.headers.get("Accept", "") else "json"
+            use_auto_detection = self.get_query_argument("auto_detect", "true").lower() not in ("false", "0", "no")
+            default_level = self.get_query_argument("default_level", DEFAULT_LEVEL)
+            if default_level not in HIERARCHY_LEVELS:
+                self.send_json_error(400, f"Unknown default_level: {default_level}")
+                return
+
+            loop = asyncio.get_running_loop()
+            try:
+                result = await loop.run_in_executor(
+                    self.executor, self.batch_fn, self.request.body, content_type,
+                    use_auto_detection, default_level, self.max_rows, self.band_levels
+                )
+            except BatchError as e:
+                self.send_json_error(e.status, e.message)
+                return
+
+            self.set_header("Content-Type", "text/csv; charset=utf-8" if output_format == "csv" else "application/json; charset=utf-8")
+            for chunk in encode_chunks(result, output_format):
+                self.write(chunk)
+                await self.flush()
+            failed = False
+        finally:
+            self.tracker.record(time.perf_counter() - started, failed)
+
+    def send_json_error(self, status, message):
+        self.set_status(status)
+        self.finish({'error': message})
+
+
+class HealthHandler(tornado.web.RequestHandler):
+    def get(self):
+        self.finish({'status': 'ok'})
+
+
+class MetricsHandler(tornado.web.RequestHandler):
+    def initialize(self, tracker):
+        self.tracker = tracker
+
+    def get(self):
+        self.finish(self.tracker.summary())
+
+
+def make_app(executor, tracker, max_rows, band_levels=None):
+    """Builds the tornado application with all batch endpoints"""
+    batch_args = {'executor': executor, 'tracker': tracker, 'max_rows': max_rows, 'band_levels': band_levels}
+    return tornado.web.Application([
+        (r"/v1/titles", BatchHandler, dict(batch_fn=run_titles_batch, **batch_args)),
+        (r"/v1/hierarchy", BatchHandler, dict(batch_fn=run_hierarchy_batch, **batch_args)),
+        (r"/v1/health", HealthHandler),
+        (r"/v1/metrics", MetricsHandler, dict(tracker=tracker)),
+    ])
+
+
+async def serve(args):
+    band_levels = None
+    if args.band_reference:
+        with open(args.band_reference, "rb") as f:
+            band_levels = load_band_reference(read_csv_extract(f.read(), "utf-8"))
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        tracker = LatencyTracker()
+        app = make_app(executor, tracker, args.max_rows, band_levels)
+        server = tornado.httpserver.HTTPServer(app, max_body_size=args.max_body_mb * 1024 * 1024)
+        server.listen(args.port, address=args.host)
+        print(f"Job title API listening on http://{args.host}:{args.port} with {args.workers} workers")
+        await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local batch API for job title generation")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: localhost only)")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes for batch processing")
+    parser.add_argument("--max-body-mb", type=int, default=64, help="Maximum request body size in MB")
+    parser.add_argument("--max-rows", type=int, default=200000, help="Maximum rows per request")
+    parser.add_argument("--band-reference", help="CSV of SAL_BAND,HIERARCHY_LEVEL used before the JOB_TEXT rules")
+    args = parser.parse_args()
+    asyncio.run(serve(args))
+
+
+if __name__ == "__main__":
+    main()
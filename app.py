@@ -1,7 +1,25 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-import io
+import math
+
+from job_titles import (
+    HIERARCHY_LEVELS, DEFAULT_LEVEL, SOURCE_DEFAULT, generate_final_title, generate_titles, build_entries,
+    load_band_reference, normalize_pernrs, find_column
+)
+from hierarchy_index import HierarchyIndex
+from validation import validate_import, invalid_rows, ERROR, WARNING
+from job_store import DiskJobTable, DiskJobView, append_rows, filter_rows, iter_frames
+from importer import parse_space_separated, read_csv_extract, csv_line_numbers, read_extract
+from compare import (
+    COMPARE_COLUMNS, ADDED, REMOVED, CHANGED, load_extract, missing_pernr, collect_job_table, diff_extracts, summarize
+)
+
+# Rows per page when an out-of-core table is displayed
+PAGE_SIZE = 1000
+
+# Rows of a comparison shown on screen (the export always has all of them)
+COMPARE_DISPLAY_ROWS = 10000
 
 # Set page configuration
 st.set_page_config(
@@ -88,16 +106,25 @@ st.markdown("""
 
 # Initialize session state to store our data
 if 'job_data' not in st.session_state:
-    st.session_state.job_data = pd.DataFrame(columns=['Division', 'Subdivision', 'Job Title', 'Final Job Title', 'PERNR', 'JOB_CODE', 'Created'])
+    st.session_state.job_data = pd.DataFrame(columns=['Division', 'Subdivision', 'Job Title', 'Final Job Title', 'PERNR', 'JOB_CODE', 'SUBPSL', 'SAL_BAND', 'Created'])
 
 # Ensure all string columns are of string type to prevent sorting issues
-if not st.session_state.job_data.empty:
+# (tables spilled to disk are always stored as strings)
+if isinstance(st.session_state.job_data, pd.DataFrame) and not st.session_state.job_data.empty:
     for col in ['Division', 'Subdivision', 'PERNR', 'JOB_CODE', 'Job Title', 'Final Job Title']:
         if col in st.session_state.job_data.columns:
             st.session_state.job_data[col] = st.session_state.job_data[col].astype(str)
 
+# Build the Division -> Subdivision -> Level index once; inserts below keep it up to date
+if 'job_index' not in st.session_state or st.session_state.job_index.total != len(st.session_state.job_data):
+    st.session_state.job_index = HierarchyIndex()
+    st.session_state.pernr_index = set()
+    for chunk in iter_frames(st.session_state.job_data):
+        st.session_state.job_index.add_frame(chunk)
+        st.session_state.pernr_index.update(normalize_pernrs(chunk['PERNR']))
+
 # Create tabs for manual entry and import
-tab1, tab2 = st.tabs(["Manual Entry", "Import from CSV"])
+tab1, tab2, tab3 = st.tabs(["Manual Entry", "Import from CSV", "Compare Extracts"])
 
 with tab1:
     # Create two columns: form and stats
@@ -117,25 +144,10 @@ with tab1:
                 subdivision = st.text_input("Subdivision", placeholder="e.g., Strategy")
             
             with col3:
-                job_titles = [
-                    "Officer",
-                    "Senior Officer",
-                    "Associate Analyst",
-                    "Analyst",
-                    "Specialist",
-                    "Senior Specialist",
-                    "Manager",
-                    "Senior Manager",
-                    "Director",
-                    "Senior Director",
-                    "Vice President",
-                    "Senior Vice President",
-                    "Chief (Top of the Org)"
-                ]
-                job_title = st.selectbox("Hierarchy Level", options=job_titles)
+                job_title = st.selectbox("Hierarchy Level", options=HIERARCHY_LEVELS)
             
             # Additional fields for PERNR and JOB_CODE
-            col4, col5 = st.columns(2)
+            col4, col5, col6, col7 = st.columns(4)
             
             with col4:
                 pernr = st.text_input("PERNR", placeholder="e.g., 105804")
@@ -143,14 +155,17 @@ with tab1:
             with col5:
                 job_code = st.text_input("JOB_CODE", placeholder="e.g., A409-ESG")
             
+            with col6:
+                subpsl = st.text_input("SUBPSL", placeholder="e.g., ESG-MGT")
+            
+            with col7:
+                sal_band = st.text_input("SAL_BAND", placeholder="e.g., D3-ESG")
+            
             st.markdown("<hr>", unsafe_allow_html=True)
             
             # Generate the final job title before form submission
             if division and subdivision and job_title:
-                if job_title == "Chief (Top of the Org)":
-                    final_job_title = f"Chief {division} Officer"
-                else:
-                    final_job_title = f"{division} {subdivision} {job_title}"
+                final_job_title = generate_final_title(division, subdivision, job_title)
             else:
                 final_job_title = ""
             
@@ -176,6 +191,7 @@ with tab1:
             
             # Process form submission
             if submit_button and division and subdivision and job_title:
+                pernr = pernr.strip()
                 # Create a new row
                 new_row = pd.DataFrame({
                     'Division': [division],
@@ -184,11 +200,16 @@ with tab1:
                     'Final Job Title': [final_job_title],
                     'PERNR': [pernr if pernr else ""],
                     'JOB_CODE': [job_code if job_code else ""],
+                    'SUBPSL': [subpsl if subpsl else ""],
+                    'SAL_BAND': [sal_band if sal_band else ""],
                     'Created': [datetime.now().strftime("%Y-%m-%d %H:%M")]
                 })
                 
                 # Append to existing data
-                st.session_state.job_data = pd.concat([st.session_state.job_data, new_row], ignore_index=True)
+                st.session_state.job_data = append_rows(st.session_state.job_data, new_row)
+                st.session_state.job_index.add(division, subdivision, job_title)
+                if pernr:
+                    st.session_state.pernr_index.add(pernr)
                 st.markdown("""
                 <div class="success-message">
                     ✅ Job title added successfully!
@@ -201,8 +222,8 @@ with tab1:
             st.markdown('<p class="section-header">Statistics</p>', unsafe_allow_html=True)
             
             total_entries = len(st.session_state.job_data)
-            divisions_count = st.session_state.job_data['Division'].nunique()
-            subdivisions_count = st.session_state.job_data['Subdivision'].nunique()
+            divisions_count = len(st.session_state.job_index.division_counts)
+            subdivisions_count = len(st.session_state.job_index.subdivisions())
             
             st.markdown(f"""
             <div style="background-color: #F8FAFC; padding: 15px; border-radius: 10px; box-shadow: 0 2px 5px rgba(0, 0, 0, 0.05);">
@@ -221,7 +242,8 @@ with tab2:
     <div class="info-box">
         <strong>CSV Import Instructions:</strong><br>
         • Upload a CSV file containing employee data<br>
-        • The system will extract Division, PSL (as Subdivision), PERNR, and JOB_CODE<br>
+        • The system will extract Division, PSL (as Subdivision), PERNR, JOB_CODE, SUBPSL and SAL_BAND<br>
+        • Optionally upload a salary band reference so hierarchy levels come from SAL_BAND<br>
         • Select a hierarchy level to apply to all imported entries<br>
         • Preview and confirm before adding to the database
     </div>
@@ -248,11 +270,33 @@ with tab2:
     )
     delimiter = "," if delimiter_option == "Comma-separated (CSV)" else None  # None will use whitespace
     
+    # Optional salary band -> hierarchy level reference, used before the JOB_TEXT rules
+    band_levels = None
+    with st.expander("Salary Band Reference (optional)"):
+        st.markdown("""
+        Upload a comma-separated file with **SAL_BAND** and **HIERARCHY_LEVEL** columns (e.g. `D3-ESG,Senior Officer`).
+        Rows whose salary band is listed get their hierarchy level from this table; the JOB_TEXT rules
+        are only used for unknown bands.
+        """)
+        band_file = st.file_uploader("Upload band reference", type=["csv", "txt"], key="band_reference")
+        if band_file is not None:
+            try:
+                band_levels = load_band_reference(read_csv_extract(band_file.getvalue(), selected_encoding))
+                st.success(f"Loaded hierarchy levels for {len(band_levels)} salary bands.")
+            except Exception as e:
+                st.error(f"Error reading band reference: {str(e)}")
+    
     if uploaded_file is not None:
         try:
             # Read file content
             file_content = uploaded_file.read()
             
+            # Source line and field count of each parsed row, used by validation
+            line_numbers = None
+            token_counts = None
+            skipped_lines = []
+            expected_fields = None
+            
             # If space-separated, convert to proper CSV format first
             if delimiter_option == "Space-separated (TXT)":
                 # Decode using selected encoding
@@ -264,58 +308,8 @@ with tab2:
                         st.text(content_str[:1000] + "..." if len(content_str) > 1000 else content_str)
                     
                     # Process the space-separated data
-                    lines = content_str.strip().split('\n')
-                    
-                    # Auto-detect header
-                    if "PERNR" in lines[0] and "DIVISION" in lines[0] and "PSL" in lines[0]:
-                        header = lines[0].split()
-                        data_lines = lines[1:]
-                    else:
-                        # Assume first line is data, create generic headers
-                        num_columns = len(lines[0].split())
-                        default_headers = ["PERNR", "JOB_TEXT", "DIVISION", "PSL", "SUBPSL", "SAL_BAND", "JOB_CODE"]
-                        
-                        # Use default headers if they match the column count, otherwise create generic ones
-                        if num_columns == len(default_headers):
-                            header = default_headers
-                        else:
-                            header = [f"Column_{i+1}" for i in range(num_columns)]
-                        
-                        data_lines = lines
-                    
-                    # Convert to pandas DataFrame
-                    data_rows = []
-                    for line in data_lines:
-                        # Split by whitespace but keep multiple spaces within quotes
-                        values = []
-                        current = ""
-                        in_quotes = False
-                        
-                        for char in line:
-                            if char == '"':
-                                in_quotes = not in_quotes
-                                current += char
-                            elif char.isspace() and not in_quotes:
-                                if current:
-                                    values.append(current)
-                                    current = ""
-                            else:
-                                current += char
-                        
-                        if current:
-                            values.append(current)
-                            
-                        # Only add rows that have enough columns
-                        if len(values) >= 4:  # Need at least PERNR, DIVISION, PSL, JOB_CODE
-                            # Make sure we have enough values to match header length
-                            while len(values) < len(header):
-                                values.append("")
-                            # Truncate if too many values
-                            values = values[:len(header)]
-                            data_rows.append(values)
-                    
-                    # Create DataFrame
-                    csv_data = pd.DataFrame(data_rows, columns=header)
+                    csv_data, line_numbers, token_counts, skipped_lines = parse_space_separated(content_str)
+                    expected_fields = len(csv_data.columns)
                     
                 except Exception as e:
                     st.error(f"Error processing space-separated file: {str(e)}")
@@ -324,10 +318,16 @@ with tab2:
                 # Regular CSV processing
                 try:
                     # Try to read with pandas directly
-                    csv_data = pd.read_csv(io.BytesIO(file_content), encoding=selected_encoding, delimiter=delimiter)
+                    csv_data = read_csv_extract(file_content, selected_encoding, delimiter)
+                    line_numbers = csv_line_numbers(file_content, selected_encoding, delimiter)
                 except Exception as e:
                     st.error(f"Error reading CSV with pandas: {str(e)}")
                     st.stop()
+                
+                if len(line_numbers) != len(csv_data):
+                    # Should not happen; validation then falls back to data row numbers
+                    line_numbers = None
+                    st.caption("Could not match rows to file lines; the validation report numbers data rows instead.")
             
             # Display preview of the processed data
             st.markdown("### CSV Preview")
@@ -363,8 +363,11 @@ with tab2:
                         # Assume columns are in this order: PERNR, JOB_TEXT, DIVISION, PSL, SUBPSL, SAL_BAND, JOB_CODE
                         position_mapping = {
                             csv_data.columns[0]: 'PERNR',
+                            csv_data.columns[1]: 'JOB_TEXT',
                             csv_data.columns[2]: 'DIVISION',
                             csv_data.columns[3]: 'PSL',
+                            csv_data.columns[4]: 'SUBPSL',
+                            csv_data.columns[5]: 'SAL_BAND',
                             csv_data.columns[6]: 'JOB_CODE'
                         }
                     elif len(csv_data.columns) >= 4:
@@ -401,230 +404,136 @@ with tab2:
                     st.write("Found columns:", list(csv_data.columns))
                     
                     st.stop()
+            
+            # Validate the whole batch before anything is imported
+            st.markdown("### Validation")
+            validation_report = validate_import(
+                csv_data,
+                existing_pernrs=st.session_state.pernr_index,
+                line_numbers=line_numbers,
+                token_counts=token_counts,
+                expected_fields=expected_fields,
+                skipped_lines=skipped_lines
+            )
+            rejected = invalid_rows(csv_data, validation_report, line_numbers)
+            
+            if validation_report.empty:
+                st.success(f"All {len(csv_data)} rows passed validation.")
             else:
-                with st.form(key="import_form"):
-                    st.markdown("### Automatic Hierarchy Level Assignment")
-                    
-                    # Display info about automatic hierarchy detection
-                    st.info("""
-                        The system will automatically analyze the JOB_TEXT field to determine the appropriate 
-                        hierarchy level for each position. You can override this with a default selection below.
-                    """)
-                    
-                    # Option to override automatic detection
-                    use_auto_detection = st.checkbox("Use automatic hierarchy detection based on JOB_TEXT", value=True)
-                    
-                    # Hierarchy level selection only displayed if auto detection is turned off
-                    imported_job_title = "Specialist"  # Default fallback
-                    if not use_auto_detection:
-                        imported_job_title = st.selectbox(
-                            "Select Default Hierarchy Level for All Imported Entries",
-                            options=[
-                                "Officer",
-                                "Senior Officer",
-                                "Associate Analyst",
-                                "Analyst",
-                                "Specialist",
-                                "Senior Specialist",
-                                "Manager",
-                                "Senior Manager",
-                                "Director",
-                                "Senior Director",
-                                "Vice President",
-                                "Senior Vice President",
-                                "Chief (Top of the Org)"
-                            ],
-                            index=4  # Default to Specialist
+                error_count = (validation_report['Severity'] == ERROR).sum()
+                warning_count = (validation_report['Severity'] == WARNING).sum()
+                st.warning(
+                    f"Found {error_count} errors and {warning_count} warnings. "
+                    f"{rejected.sum()} of {len(csv_data)} rows have errors."
+                )
+                st.dataframe(
+                    validation_report.groupby(['Severity', 'Issue']).size().reset_index(name='Rows')
+                    if len(validation_report) > 1000 else validation_report,
+                    use_container_width=True,
+                    hide_index=True
+                )
+                st.download_button(
+                    "📥 Download Validation Report",
+                    validation_report.to_csv(index=False).encode('utf-8'),
+                    "validation_report.csv",
+                    "text/csv",
+                    key='download-validation',
+                    help="Download every validation issue with its line number"
+                )
+            
+            with st.form(key="import_form"):
+                st.markdown("### Automatic Hierarchy Level Assignment")
+                
+                # Display info about automatic hierarchy detection
+                st.info("""
+                    The system will automatically determine the appropriate hierarchy level for each position,
+                    from the salary band reference when one is loaded and otherwise by analyzing the JOB_TEXT field.
+                    You can override this with a default selection below.
+                """)
+                
+                # Option to override automatic detection
+                use_auto_detection = st.checkbox("Use automatic hierarchy detection (salary band, then JOB_TEXT)", value=True)
+                
+                # Hierarchy level selection only displayed if auto detection is turned off
+                imported_job_title = DEFAULT_LEVEL  # Default fallback
+                if not use_auto_detection:
+                    imported_job_title = st.selectbox(
+                        "Select Default Hierarchy Level for All Imported Entries",
+                        options=HIERARCHY_LEVELS,
+                        index=HIERARCHY_LEVELS.index(DEFAULT_LEVEL)
+                    )
+                
+                # Preview of generated titles
+                st.markdown("### Title Generation Preview")
+                
+                # Create sample of titles to show
+                sample_size = min(5, len(csv_data))
+                sample_data = csv_data.head(sample_size).copy()
+                
+                # Generate sample titles and detected hierarchy levels in one vectorized pass
+                sample_titles = generate_titles(sample_data, use_auto_detection, imported_job_title, band_levels)
+                sample_data['Detected Hierarchy'] = sample_titles['Detected Hierarchy'].mask(
+                    sample_titles['Hierarchy Source'] == SOURCE_DEFAULT,
+                    "Default: " + sample_titles['Detected Hierarchy']
+                )
+                sample_data['Hierarchy Source'] = sample_titles['Hierarchy Source']
+                sample_data['Sample Final Title'] = sample_titles['Final Job Title']
+                preview_columns = ['PERNR', 'DIVISION', 'PSL', 'Detected Hierarchy', 'Hierarchy Source', 'Sample Final Title']
+                band_col = find_column(sample_data, 'SAL_BAND')
+                if band_col is not None:
+                    preview_columns.insert(3, band_col)
+                
+                # Display sample with detected hierarchy levels
+                st.dataframe(
+                    sample_data[preview_columns],
+                    use_container_width=True,
+                    column_config={
+                        "Sample Final Title": st.column_config.TextColumn(
+                            "Sample Final Title",
+                            width="large"
+                        ),
+                        "Detected Hierarchy": st.column_config.TextColumn(
+                            "Detected Hierarchy Level",
+                            width="medium"
                         )
-                    
-                    # Helper function to determine hierarchy level from job text
-                    def determine_hierarchy_level(job_text):
-                        """Analyzes job text to determine the appropriate hierarchy level"""
-                        if not job_text or not isinstance(job_text, str):
-                            return "Specialist"  # Default fallback
-                        
-                        job_text = job_text.lower()
-                        
-                        # C-level and top executives
-                        if any(term in job_text for term in ["chief", "ceo", "cfo", "cio", "cto", "president", "exec vp"]):
-                            return "Chief (Top of the Org)"
-                            
-                        # Senior Vice President
-                        if any(term in job_text for term in ["sr vp", "sr. vp", "senior vp", "senior vice president", "sr vice president", "svp"]):
-                            return "Senior Vice President"
-                            
-                        # Vice President
-                        if any(term in job_text for term in [" vp", "vice president", "vice pres"]) and "senior" not in job_text and "sr" not in job_text:
-                            return "Vice President"
-                            
-                        # Senior Director
-                        if any(term in job_text for term in ["sr director", "sr. director", "senior director", "sr dir", "sr. dir", "senior dir"]):
-                            return "Senior Director"
-                            
-                        # Director
-                        if any(term in job_text for term in [" director", " dir "]) and "senior" not in job_text and "sr" not in job_text:
-                            return "Director"
-                            
-                        # Senior Manager
-                        if any(term in job_text for term in ["sr manager", "sr. manager", "senior manager", "sr mgr", "sr. mgr", "senior mgr"]):
-                            return "Senior Manager"
-                            
-                        # Manager
-                        if any(term in job_text for term in [" manager", " mgr", "supervisor", "supv", "lead"]) and "senior" not in job_text and "sr" not in job_text:
-                            return "Manager"
-                            
-                        # Senior Specialist
-                        if any(term in job_text for term in ["sr specialist", "sr. specialist", "senior specialist", "principal", "sr tech", "senior tech", "advisor", "sr prof", "senior prof"]):
-                            return "Senior Specialist"
-                            
-                        # Specialist
-                        if any(term in job_text for term in ["specialist", "technologist", "tech prof", "engineer", " tech", "technician", "scientist"]):
-                            return "Specialist"
-                            
-                        # Senior Analyst
-                        if any(term in job_text for term in ["sr analyst", "sr. analyst", "senior analyst"]):
-                            return "Analyst"  # We'll use Analyst for Senior Analyst since it's not in our hierarchy levels
-                            
-                        # Analyst
-                        if "analyst" in job_text and "associate" not in job_text:
-                            return "Analyst"
-                            
-                        # Associate Analyst
-                        if any(term in job_text for term in ["assoc analyst", "associate analyst", "jr analyst", "junior analyst"]):
-                            return "Associate Analyst"
-                            
-                        # Senior Officer
-                        if any(term in job_text for term in ["sr officer", "sr. officer", "senior officer", "sr secretary", "senior secretary", "sr assistant", "senior assistant"]):
-                            return "Senior Officer"
-                            
-                        # Officer and other entry-level positions
-                        if any(term in job_text for term in ["officer", "clerk", "secretary", "assistant", "coordinator", "rep", "operator", "handler"]):
-                            return "Officer"
-                        
-                        # For roles without clear indicators, look for some contextual clues
-                        if any(term in job_text for term in ["sr", "senior", "prin", "principal"]):
-                            return "Senior Specialist"
-                        
-                        # Default fallback for unrecognized roles
-                        return "Specialist"
-                    
-                    # Get JOB_TEXT column name (could be different case)
-                    job_text_col = None
-                    for col in csv_data.columns:
-                        if col.upper() == "JOB_TEXT":
-                            job_text_col = col
-                            break
-                    
-                    # Preview of generated titles
-                    st.markdown("### Title Generation Preview")
-                    
-                    # Create sample of titles to show
-                    sample_size = min(5, len(csv_data))
-                    sample_data = csv_data.head(sample_size).copy()
-                    
-                    # Generate sample titles and detected hierarchy levels
-                    sample_data['Detected Hierarchy'] = ""
-                    sample_data['Sample Final Title'] = ""
-                    
-                    # Generate sample titles using automatic detection or default
-                    for i, row in sample_data.iterrows():
-                        division = row['DIVISION']
-                        subdivision = row['PSL']
-                        
-                        # Determine hierarchy level - automatic or default
-                        if use_auto_detection and job_text_col:
-                            job_text = str(row[job_text_col])
-                            hierarchy = determine_hierarchy_level(job_text)
-                            sample_data.at[i, 'Detected Hierarchy'] = hierarchy
-                        else:
-                            hierarchy = imported_job_title
-                            sample_data.at[i, 'Detected Hierarchy'] = f"Default: {hierarchy}"
-                        
-                        # Generate final title
-                        if hierarchy == "Chief (Top of the Org)":
-                            final_title = f"Chief {division} Officer"
-                        else:
-                            final_title = f"{division} {subdivision} {hierarchy}"
-                        
-                        sample_data.at[i, 'Sample Final Title'] = final_title
-                    
-                    # Display sample with detected hierarchy levels
-                    st.dataframe(
-                        sample_data[['PERNR', 'DIVISION', 'PSL', 'Detected Hierarchy', 'Sample Final Title']],
-                        use_container_width=True,
-                        column_config={
-                            "Sample Final Title": st.column_config.TextColumn(
-                                "Sample Final Title",
-                                width="large"
-                            ),
-                            "Detected Hierarchy": st.column_config.TextColumn(
-                                "Detected Hierarchy Level",
-                                width="medium"
-                            )
-                        }
+                    }
+                )
+                
+                # Rows with validation errors are left out unless the user opts in
+                skip_invalid = True
+                if rejected.any():
+                    skip_invalid = st.checkbox(
+                        f"Skip the {rejected.sum()} rows with validation errors",
+                        value=True
                     )
+                import_data = csv_data[~rejected] if skip_invalid else csv_data
+                
+                # Calculate total entries to be added
+                total_to_add = len(import_data)
+                st.info(f"Total entries to be added: {total_to_add}")
+                
+                # Submit button
+                import_button = st.form_submit_button("Import All Job Titles")
+                
+                if import_button:
+                    # Detect hierarchy levels and render titles for the whole batch at once
+                    new_data = build_entries(import_data, use_auto_detection, imported_job_title, band_levels)
+                    new_data['Created'] = datetime.now().strftime("%Y-%m-%d %H:%M")
                     
-                    # Calculate total entries to be added
-                    total_to_add = len(csv_data)
-                    st.info(f"Total entries to be added: {total_to_add}")
+                    # Also convert data types in the existing job_data to ensure consistency
+                    if isinstance(st.session_state.job_data, pd.DataFrame) and not st.session_state.job_data.empty:
+                        for col in ['Division', 'Subdivision', 'PERNR', 'JOB_CODE']:
+                            if col in st.session_state.job_data.columns:
+                                st.session_state.job_data[col] = st.session_state.job_data[col].astype(str)
                     
-                    # Submit button
-                    import_button = st.form_submit_button("Import All Job Titles")
+                    # Append to existing data
+                    st.session_state.job_data = append_rows(st.session_state.job_data, new_data)
+                    st.session_state.job_index.add_frame(new_data)
+                    if not new_data.empty:
+                        st.session_state.pernr_index.update(new_data['PERNR'])
+                    
+                    st.success(f"✅ Successfully imported {len(new_data)} job titles!")
                     
-                    if import_button:
-                        # Process the data
-                        new_rows = []
-                        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
-                        
-                        for _, row in csv_data.iterrows():
-                            division = row['DIVISION']
-                            subdivision = row['PSL']
-                            pernr = str(row['PERNR'])
-                            job_code = row['JOB_CODE']
-                            
-                            # MODIFIED: Use detected hierarchy level for each row if auto detection is enabled
-                            if use_auto_detection and job_text_col:
-                                job_text = str(row[job_text_col])
-                                hierarchy_level = determine_hierarchy_level(job_text)
-                            else:
-                                hierarchy_level = imported_job_title
-                            
-                            # Generate final job title
-                            if hierarchy_level == "Chief (Top of the Org)":
-                                final_job_title = f"Chief {division} Officer"
-                            else:
-                                final_job_title = f"{division} {subdivision} {hierarchy_level}"
-                            
-                            # Add to new rows
-                            new_rows.append({
-                                'Division': division,
-                                'Subdivision': subdivision,
-                                'Job Title': hierarchy_level,  # MODIFIED: Use detected hierarchy level instead of default
-                                'Final Job Title': final_job_title,
-                                'PERNR': pernr,
-                                'JOB_CODE': job_code,
-                                'Created': timestamp
-                            })
-                        
-                        # Create DataFrame from new rows
-                        new_data = pd.DataFrame(new_rows)
-                        
-                        # Convert all data in the new rows to string type to prevent type comparison issues
-                        for col in ['Division', 'Subdivision', 'PERNR', 'JOB_CODE']:
-                            if col in new_data.columns:
-                                new_data[col] = new_data[col].astype(str)
-                        
-                        # Also convert data types in the existing job_data to ensure consistency
-                        if not st.session_state.job_data.empty:
-                            for col in ['Division', 'Subdivision', 'PERNR', 'JOB_CODE']:
-                                if col in st.session_state.job_data.columns:
-                                    st.session_state.job_data[col] = st.session_state.job_data[col].astype(str)
-                        
-                        # Append to existing data
-                        st.session_state.job_data = pd.concat([st.session_state.job_data, new_data], ignore_index=True)
-                        
-                        st.success(f"✅ Successfully imported {len(new_rows)} job titles!")
-                        
         except Exception as e:
             st.error(f"Error processing CSV file: {str(e)}")
             st.markdown("""
@@ -634,6 +543,114 @@ with tab2:
             </div>
             """, unsafe_allow_html=True)
 
+# Parsed extracts are cached by content so reruns don't re-parse large uploads
+@st.cache_data(max_entries=4, show_spinner="Reading extract...")
+def load_compare_extract(file_content, encoding, space_separated, use_auto_detection, band_levels):
+    return load_extract(read_extract(file_content, encoding, space_separated), use_auto_detection, band_levels)
+
+with tab3:
+    # Compare two extracts joined on PERNR
+    st.markdown('<p class="section-header">Compare Extracts</p>', unsafe_allow_html=True)
+    
+    st.markdown("""
+    <div class="info-box">
+        <strong>Compare Instructions:</strong><br>
+        • Compare the current table with a new extract, or two extracts with each other<br>
+        • Employees are matched on PERNR<br>
+        • The result lists who joined, who left, and whose Division, PSL, hierarchy level or Final Job Title changed
+    </div>
+    """, unsafe_allow_html=True)
+    
+    compare_mode = st.radio(
+        "Compare",
+        options=["Current table vs new upload", "Two uploads"],
+        horizontal=True
+    )
+    
+    compare_col1, compare_col2 = st.columns(2)
+    with compare_col1:
+        compare_encoding = st.selectbox("Select file encoding", options=encoding_options, index=1, key="compare_encoding")
+    with compare_col2:
+        compare_format = st.radio(
+            "File format",
+            options=["Comma-separated (CSV)", "Space-separated (TXT)"],
+            index=1,
+            key="compare_format"
+        )
+    compare_space_separated = compare_format == "Space-separated (TXT)"
+    compare_auto_detection = st.checkbox(
+        "Use automatic hierarchy detection (salary band, then JOB_TEXT)",
+        value=True,
+        key="compare_auto_detection"
+    )
+    
+    before_file = None
+    if compare_mode == "Two uploads":
+        before_file = st.file_uploader("Previous extract", type=["csv", "txt"], key="compare_before")
+    after_file = st.file_uploader("New extract", type=["csv", "txt"], key="compare_after")
+    
+    try:
+        before_data = None
+        before_left_out = 0
+        if compare_mode == "Current table vs new upload":
+            if st.session_state.job_data.empty:
+                st.info("The job table is empty. Add or import job titles first, or compare two uploads.")
+            else:
+                st.caption(
+                    "PERNR and the compared fields of the current table are loaded into memory for the comparison, "
+                    "even when the table itself is stored on disk."
+                )
+                before_data, before_left_out = collect_job_table(
+                    iter_frames(st.session_state.job_data, ['PERNR'] + COMPARE_COLUMNS)
+                )
+        elif before_file is not None:
+            before_data = load_compare_extract(
+                before_file.getvalue(), compare_encoding, compare_space_separated, compare_auto_detection, band_levels
+            )
+            before_left_out = int(missing_pernr(before_data).sum())
+        
+        if before_data is not None and after_file is not None:
+            after_data = load_compare_extract(
+                after_file.getvalue(), compare_encoding, compare_space_separated, compare_auto_detection, band_levels
+            )
+            after_left_out = int(missing_pernr(after_data).sum())
+            diff = diff_extracts(before_data, after_data)
+            counts = summarize(diff)
+            
+            if before_left_out or after_left_out:
+                st.warning(
+                    f"Left out {before_left_out} previous and {after_left_out} new rows without a PERNR, "
+                    "since they cannot be matched."
+                )
+            
+            metric_col1, metric_col2, metric_col3 = st.columns(3)
+            metric_col1.metric("Joined", counts[ADDED])
+            metric_col2.metric("Left", counts[REMOVED])
+            metric_col3.metric("Changed", counts[CHANGED])
+            
+            change_filter = st.multiselect(
+                "Show changes",
+                options=[ADDED, REMOVED, CHANGED],
+                default=[ADDED, REMOVED, CHANGED],
+                key="compare_change_filter"
+            )
+            shown_diff = diff[diff['Change'].isin(change_filter)]
+            
+            if len(shown_diff) > COMPARE_DISPLAY_ROWS:
+                st.caption(f"Showing the first {COMPARE_DISPLAY_ROWS} of {len(shown_diff)} differences. The export contains all of them.")
+            st.dataframe(shown_diff.head(COMPARE_DISPLAY_ROWS), use_container_width=True, hide_index=True)
+            
+            st.download_button(
+                "💾 Export Comparison as CSV",
+                shown_diff.to_csv(index=False).encode('utf-8'),
+                "job_title_changes.csv",
+                "text/csv",
+                key='download-compare',
+                help="Download the differences shown above as a CSV file"
+            )
+    except Exception as e:
+        st.error(f"Error comparing extracts: {str(e)}")
+
 # Add a separator
 st.markdown("<hr>", unsafe_allow_html=True)
 
@@ -657,24 +674,27 @@ if not st.session_state.job_data.empty:
     # Ensure all fields are strings before generating filter options
     string_columns = ['Division', 'Subdivision', 'Job Title']
     for col in string_columns:
-        if col in st.session_state.job_data.columns:
+        if isinstance(st.session_state.job_data, pd.DataFrame) and col in st.session_state.job_data.columns:
             st.session_state.job_data[col] = st.session_state.job_data[col].astype(str)
     
+    # Filter options cascade: each list only shows values under the selections above it
+    job_index = st.session_state.job_index
+    
     division_filter = st.sidebar.multiselect(
         "Division",
-        options=sorted(st.session_state.job_data['Division'].unique()),
+        options=job_index.divisions(),
         help="Select one or more divisions to filter"
     )
     
     subdivision_filter = st.sidebar.multiselect(
         "Subdivision",
-        options=sorted(st.session_state.job_data['Subdivision'].unique()),
+        options=job_index.subdivisions(division_filter),
         help="Select one or more subdivisions to filter"
     )
     
     job_title_filter = st.sidebar.multiselect(
         "Hierarchy Level",
-        options=sorted(st.session_state.job_data['Job Title'].unique()),
+        options=job_index.levels(division_filter, subdivision_filter),
         help="Select one or more hierarchy levels to filter"
     )
     
@@ -697,24 +717,12 @@ if not st.session_state.job_data.empty:
 else:
     st.sidebar.info("Add job titles to enable filtering")
 
-# Apply filters to data
-filtered_data = st.session_state.job_data.copy()
-
-if division_filter:
-    filtered_data = filtered_data[filtered_data['Division'].isin(division_filter)]
-
-if subdivision_filter:
-    filtered_data = filtered_data[filtered_data['Subdivision'].isin(subdivision_filter)]
-
-if job_title_filter:
-    filtered_data = filtered_data[filtered_data['Job Title'].isin(job_title_filter)]
-
-# Apply text filters for PERNR and JOB_CODE
-if pernr_filter:
-    filtered_data = filtered_data[filtered_data['PERNR'].str.contains(pernr_filter, na=False)]
-
-if job_code_filter:
-    filtered_data = filtered_data[filtered_data['JOB_CODE'].str.contains(job_code_filter, na=False)]
+# Apply filters to data (streamed over the files when the table is stored on disk)
+filtered_data = filter_rows(
+    st.session_state.job_data,
+    {'Division': division_filter, 'Subdivision': subdivision_filter, 'Job Title': job_title_filter},
+    {'PERNR': pernr_filter, 'JOB_CODE': job_code_filter}
+)
 
 # Main content - Database display
 st.markdown('<p class="section-header">Job Titles Database</p>', unsafe_allow_html=True)
@@ -725,6 +733,9 @@ if not st.session_state.job_data.empty:
     if division_filter or subdivision_filter or job_title_filter or pernr_filter or job_code_filter:
         filter_text = f" (filtered: showing {len(filtered_data)} of {len(st.session_state.job_data)} entries)"
     
+    if isinstance(st.session_state.job_data, DiskJobTable):
+        st.info("This table is larger than the memory budget and is stored on disk. Results are shown page by page.")
+    
     st.markdown(f"""
     <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 15px;">
         <div style="font-size: 1rem; color: #4B5563;">
@@ -732,16 +743,46 @@ if not st.session_state.job_data.empty:
         </div>
     </div>
     """, unsafe_allow_html=True)
+    
+    # Drill-down view served from the prebuilt hierarchy index
+    with st.expander("Drill Down by Division"):
+        job_index = st.session_state.job_index
+        drill_col1, drill_col2, drill_col3 = st.columns(3)
+        
+        with drill_col1:
+            st.dataframe(job_index.division_table(), use_container_width=True, hide_index=True)
+            drill_division = st.selectbox("Division", options=job_index.divisions(), key="drill_division")
+        
+        with drill_col2:
+            st.dataframe(job_index.subdivision_table(drill_division), use_container_width=True, hide_index=True)
+            drill_subdivision = st.selectbox(
+                "Subdivision",
+                options=job_index.subdivisions([drill_division]),
+                key="drill_subdivision"
+            )
+        
+        with drill_col3:
+            st.dataframe(job_index.level_table(drill_division, drill_subdivision), use_container_width=True, hide_index=True)
 
 # Display the filtered data with improved styling
 if not filtered_data.empty:
     # Reorder columns to show Final Job Title first
     display_columns = ['Final Job Title', 'PERNR', 'JOB_CODE', 'Division', 'Subdivision', 'Job Title']
-    if 'Created' in filtered_data.columns:
-        display_columns.append('Created')
+    for col in ['SUBPSL', 'SAL_BAND', 'Created']:
+        if col in filtered_data.columns:
+            display_columns.append(col)
+    
+    # Out-of-core tables are read one page at a time
+    if isinstance(filtered_data, DiskJobView):
+        page_count = math.ceil(len(filtered_data) / PAGE_SIZE)
+        page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
+        st.caption(f"Page {page} of {page_count}")
+        display_data = filtered_data.page((page - 1) * PAGE_SIZE, PAGE_SIZE)
+    else:
+        display_data = filtered_data
     
     st.dataframe(
-        filtered_data[display_columns],
+        display_data[display_columns],
         use_container_width=True,
         column_config={
             "Final Job Title": st.column_config.TextColumn(
@@ -772,8 +813,12 @@ if not filtered_data.empty:
     col1, col2, col3 = st.columns([1, 1, 2])
     
     with col1:
-        # Export functionality
-        csv = filtered_data.to_csv(index=False).encode('utf-8')
+        # Export functionality (out-of-core tables are converted only when the button is clicked,
+        # and the whole CSV is then held in memory)
+        if isinstance(filtered_data, DiskJobView):
+            csv = filtered_data.export_csv
+        else:
+            csv = filtered_data.to_csv(index=False).encode('utf-8')
         st.download_button(
             "💾 Export as CSV",
             csv,
@@ -786,10 +831,14 @@ if not filtered_data.empty:
     with col2:
         # Clear all data button
         if st.button("🗑️ Clear All Data", help="Remove all job titles from the database"):
+            if isinstance(st.session_state.job_data, DiskJobTable):
+                st.session_state.job_data.close()
             # Update for the latest columns
             st.session_state.job_data = pd.DataFrame(
-                columns=['Division', 'Subdivision', 'Job Title', 'Final Job Title', 'PERNR', 'JOB_CODE', 'Created']
+                columns=['Division', 'Subdivision', 'Job Title', 'Final Job Title', 'PERNR', 'JOB_CODE', 'SUBPSL', 'SAL_BAND', 'Created']
             )
+            st.session_state.job_index = HierarchyIndex()
+            st.session_state.pernr_index = set()
             st.success("All data cleared!")
             st.rerun()
 else:
@@ -810,22 +859,25 @@ with st.sidebar:
         Your CSV or space-separated file should contain these columns:
         ```
         PERNR JOB_TEXT DIVISION PSL SUBPSL SAL_BAND JOB_CODE
-        105804 A409-ESG-Senior-Secretary Ancillary-Support ESG MGT ESG-MGT D3-ESG A409-ESG
-        129403 R505-ESG-Account-Rep Drilling-&-Evaluation Wireline Business-Development J1-ESG R505-ESG
+        105804 "A409-ESG-Senior Secretary" "Ancillary Support" "ESG MGT" "ESG MGT" D3-ESG A409-ESG
+        129403 "R505-ESG-Account Rep" "Drilling & Evaluation" Wireline "Business Development" J1-ESG R505-ESG
         ```
         
+        In space-separated files, put values that contain spaces in double quotes.
+        
         The system will use:
         - PERNR as the employee ID
         - DIVISION as the Division
         - PSL as the Subdivision 
+        - SUBPSL and SAL_BAND as stored attributes (SAL_BAND sets the hierarchy level when a band reference is uploaded)
         - JOB_CODE for reference
         """)
         
         # Add sample data download option
         sample_data = """PERNR JOB_TEXT DIVISION PSL SUBPSL SAL_BAND JOB_CODE
-105804 A409-ESG-Senior Secretary Ancillary Support ESG MGT ESG MGT D3-ESG A409-ESG
-129403 R505-ESG-Account Rep Drilling & Evaluation Wireline Business Development J1-ESG R505-ESG
-220457 BD14-ESG-Tech Prof Drilling & Evaluation Baroid Grinding & Tolling I3-ESG BD14-ESG"""
+105804 "A409-ESG-Senior Secretary" "Ancillary Support" "ESG MGT" "ESG MGT" D3-ESG A409-ESG
+129403 "R505-ESG-Account Rep" "Drilling & Evaluation" Wireline "Business Development" J1-ESG R505-ESG
+220457 "BD14-ESG-Tech Prof" "Drilling & Evaluation" Baroid "Grinding & Tolling" I3-ESG BD14-ESG"""
         
         st.download_button(
             "Download Sample Data",
@@ -0,0 +1,93 @@
+"""Month-over-month comparison of two job tables joined on PERNR.
+
+Both sides are reduced to one row per PERNR and joined with a single hash join
+(pandas merge); changes are then detected with column-wide comparisons, so two
+500k-row extracts compare in seconds.
+"""
+
+import pandas as pd
+
+from job_titles import build_entries, find_column
+
+# Fields reported when they differ between the two extracts
+COMPARE_COLUMNS = ['Division', 'Subdivision', 'Job Title', 'Final Job Title']
+
+ADDED = 'Added'
+REMOVED = 'Removed'
+CHANGED = 'Changed'
+
+
+def load_extract(data, use_auto_detection=True, band_levels=None):
+    """Turns a parsed extract into job table rows ready for comparison"""
+    column_mapping = {}
+    for name in ['DIVISION', 'PSL', 'PERNR', 'JOB_CODE']:
+        col = find_column(data, name)
+        if col is None:
+            raise ValueError(f"Missing required column: {name}")
+        column_mapping[col] = name
+    return build_entries(data.rename(columns=column_mapping), use_auto_detection, band_levels=band_levels)
+
+
+def missing_pernr(data):
+    """Returns a mask of the rows with an empty or missing PERNR"""
+    return data['PERNR'].isna() | (data['PERNR'].astype(str).str.strip() == "")
+
+
+def collect_job_table(chunks, columns=COMPARE_COLUMNS):
+    """Gathers PERNR and the compared fields of a job table streamed in chunks.
+
+    Rows without a PERNR are dropped as they arrive. The result is held in
+    memory, one row per PERNR. Returns the rows and the number left out.
+    """
+    frames = []
+    left_out = 0
+    for chunk in chunks:
+        missing = missing_pernr(chunk)
+        left_out += int(missing.sum())
+        frames.append(chunk.loc[~missing, ['PERNR'] + columns])
+    if not frames:
+        return pd.DataFrame(columns=['PERNR'] + columns), left_out
+    data = pd.concat(frames, ignore_index=True).drop_duplicates('PERNR', keep='last')
+    return data, left_out
+
+
+def diff_extracts(before, after, columns=COMPARE_COLUMNS):
+    """Compares two job tables on PERNR.
+
+    Returns one row per added, removed or changed employee with the change type,
+    the names of the fields that differ and the before/after value of every
+    compared field. When a PERNR appears more than once, its last row is used.
+    Rows without a PERNR cannot be matched and are left out (see missing_pernr).
+    """
+    before = before[~missing_pernr(before)].drop_duplicates('PERNR', keep='last')[['PERNR'] + columns].astype(str)
+    after = after[~missing_pernr(after)].drop_duplicates('PERNR', keep='last')[['PERNR'] + columns].astype(str)
+
+    merged = pd.merge(
+        before, after, on='PERNR', how='outer', suffixes=(' (Before)', ' (After)'), indicator=True
+    )
+
+    both = merged['_merge'] == 'both'
+    changed_fields = pd.Series("", index=merged.index)
+    any_changed = pd.Series(False, index=merged.index)
+    for col in columns:
+        differs = both & (merged[f'{col} (Before)'] != merged[f'{col} (After)'])
+        changed_fields = changed_fields.mask(differs, changed_fields + col + ", ")
+        any_changed |= differs
+
+    change = pd.Series(CHANGED, index=merged.index)
+    change = change.mask(merged['_merge'] == 'left_only', REMOVED)
+    change = change.mask(merged['_merge'] == 'right_only', ADDED)
+
+    result = merged.assign(Change=change, **{'Changed Fields': changed_fields.str.rstrip(", ")})
+    result = result[~both | any_changed]
+
+    ordered_columns = ['PERNR', 'Change', 'Changed Fields']
+    for col in columns:
+        ordered_columns += [f'{col} (Before)', f'{col} (After)']
+    return result[ordered_columns].fillna("").sort_values(['Change', 'PERNR']).reset_index(drop=True)
+
+
+def summarize(diff):
+    """Returns the number of added, removed and changed employees"""
+    counts = diff['Change'].value_counts()
+    return {change: int(counts.get(change, 0)) for change in [ADDED, REMOVED, CHANGED]}
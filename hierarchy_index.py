@@ -0,0 +1,81 @@
+"""Division -> Subdivision -> Hierarchy Level tree index with row counts.
+
+The index is built once from the job table and then updated incrementally as
+rows are added, so cascading filter options and drill-down views can be read
+straight from it instead of rescanning the whole table.
+"""
+
+import pandas as pd
+
+TREE_COLUMNS = ['Division', 'Subdivision', 'Job Title']
+
+
+class HierarchyIndex:
+    """Nested counts of job entries by Division, Subdivision and hierarchy level"""
+
+    def __init__(self):
+        # {division: {subdivision: {level: count}}}
+        self.tree = {}
+        self.division_counts = {}
+        self.subdivision_counts = {}
+        self.total = 0
+
+    def add_frame(self, data):
+        """Adds the rows of data to the index, aggregating them in one groupby"""
+        if data.empty:
+            return
+        # Missing values count as empty strings, as they are stored on disk, so every row is indexed
+        grouped = data[TREE_COLUMNS].fillna("").astype(str).groupby(TREE_COLUMNS, sort=False).size()
+        for (division, subdivision, level), count in grouped.items():
+            self.add(division, subdivision, level, int(count))
+
+    def add(self, division, subdivision, level, count=1):
+        """Adds count entries for a single Division / Subdivision / level path"""
+        levels = self.tree.setdefault(division, {}).setdefault(subdivision, {})
+        levels[level] = levels.get(level, 0) + count
+        self.division_counts[division] = self.division_counts.get(division, 0) + count
+        key = (division, subdivision)
+        self.subdivision_counts[key] = self.subdivision_counts.get(key, 0) + count
+        self.total += count
+
+    def divisions(self):
+        """Returns all divisions, sorted"""
+        return sorted(self.tree)
+
+    def subdivisions(self, divisions=None):
+        """Returns the sorted subdivisions under the given divisions (all when empty)"""
+        selected = divisions or self.tree.keys()
+        names = set()
+        for division in selected:
+            names.update(self.tree.get(division, {}))
+        return sorted(names)
+
+    def levels(self, divisions=None, subdivisions=None):
+        """Returns the sorted hierarchy levels under the selected divisions and subdivisions"""
+        selected = divisions or self.tree.keys()
+        names = set()
+        for division in selected:
+            for subdivision, levels in self.tree.get(division, {}).items():
+                if not subdivisions or subdivision in subdivisions:
+                    names.update(levels)
+        return sorted(names)
+
+    def division_table(self):
+        """Returns a DataFrame of entry counts per division"""
+        return pd.DataFrame(
+            sorted(self.division_counts.items()),
+            columns=['Division', 'Entries']
+        )
+
+    def subdivision_table(self, division):
+        """Returns a DataFrame of entry counts per subdivision of a division"""
+        rows = [
+            (subdivision, self.subdivision_counts[(division, subdivision)])
+            for subdivision in sorted(self.tree.get(division, {}))
+        ]
+        return pd.DataFrame(rows, columns=['Subdivision', 'Entries'])
+
+    def level_table(self, division, subdivision):
+        """Returns a DataFrame of entry counts per hierarchy level of a subdivision"""
+        levels = self.tree.get(division, {}).get(subdivision, {})
+        return pd.DataFrame(sorted(levels.items()), columns=['Job Title', 'Entries'])
@@ -0,0 +1,126 @@
+"""Parsing of uploaded employee extracts (comma- or space-separated)."""
+
+import csv
+import io
+
+import pandas as pd
+
+# Column order of the standard HR extract
+DEFAULT_HEADERS = ["PERNR", "JOB_TEXT", "DIVISION", "PSL", "SUBPSL", "SAL_BAND", "JOB_CODE"]
+
+# Need at least PERNR, DIVISION, PSL, JOB_CODE
+MIN_FIELDS = 4
+
+
+def split_fields(line):
+    """Splits a line on whitespace, keeping quoted values together.
+
+    Quotes wrapping a whole value are removed; quotes inside a value are kept.
+    """
+    # Without quotes this is exactly str.split(), which is much faster than the loop below
+    if '"' not in line:
+        return line.split()
+
+    values = []
+    current = ""
+    in_quotes = False
+
+    for char in line:
+        if char == '"':
+            in_quotes = not in_quotes
+            current += char
+        elif char.isspace() and not in_quotes:
+            if current:
+                values.append(current)
+                current = ""
+        else:
+            current += char
+
+    if current:
+        values.append(current)
+
+    return [value[1:-1] if len(value) >= 2 and value[0] == value[-1] == '"' else value for value in values]
+
+
+def parse_space_separated(content_str):
+    """Parses a space-separated extract.
+
+    Returns (data, line_numbers, token_counts, skipped_lines): the parsed rows,
+    the source line and field count of each row, and (line, field count) pairs
+    for rows dropped because they had too few fields.
+    """
+    lines = content_str.strip().split('\n')
+
+    # Auto-detect header
+    if "PERNR" in lines[0] and "DIVISION" in lines[0] and "PSL" in lines[0]:
+        header = lines[0].split()
+        data_lines = lines[1:]
+        first_line = 2
+    else:
+        # Assume first line is data, create generic headers
+        num_columns = len(lines[0].split())
+
+        # Use default headers if they match the column count, otherwise create generic ones
+        if num_columns == len(DEFAULT_HEADERS):
+            header = DEFAULT_HEADERS
+        else:
+            header = [f"Column_{i+1}" for i in range(num_columns)]
+
+        data_lines = lines
+        first_line = 1
+
+    data_rows = []
+    line_numbers = []
+    token_counts = []
+    skipped_lines = []
+    for line_number, line in enumerate(data_lines, start=first_line):
+        values = split_fields(line)
+
+        # Only add rows that have enough columns
+        if len(values) >= MIN_FIELDS:
+            line_numbers.append(line_number)
+            token_counts.append(len(values))
+            # Make sure we have enough values to match header length
+            if len(values) < len(header):
+                values = values + [""] * (len(header) - len(values))
+            # Truncate if too many values
+            data_rows.append(values[:len(header)])
+        elif values:
+            skipped_lines.append((line_number, len(values)))
+
+    return pd.DataFrame(data_rows, columns=header), line_numbers, token_counts, skipped_lines
+
+
+def read_csv_extract(file_content, encoding, delimiter=","):
+    """Reads a delimited extract with pandas, keeping every value as text"""
+    # Read everything as text so IDs keep leading zeros and are validated as written
+    return pd.read_csv(io.BytesIO(file_content), encoding=encoding, delimiter=delimiter, dtype=str)
+
+
+def csv_line_numbers(file_content, encoding, delimiter=","):
+    """Returns the file line on which each data row of a delimited extract starts.
+
+    Mirrors read_csv_extract: the first non-blank row is the header,
+    blank lines are skipped and a quoted value may span several lines.
+    """
+    reader = csv.reader(io.TextIOWrapper(io.BytesIO(file_content), encoding=encoding, newline=""), delimiter=delimiter)
+    line_numbers = []
+    previous_line = 0
+    header = True
+    for row in reader:
+        first_line = previous_line + 1
+        previous_line = reader.line_num
+        if not row or (len(row) == 1 and not row[0].strip()):
+            continue
+        if header:
+            header = False
+            continue
+        line_numbers.append(first_line)
+    return line_numbers
+
+
+def read_extract(file_content, encoding, space_separated):
+    """Reads an uploaded extract into a DataFrame of text values"""
+    if space_separated:
+        return parse_space_separated(file_content.decode(encoding))[0]
+    return read_csv_extract(file_content, encoding)
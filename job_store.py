@@ -0,0 +1,211 @@
+"""Storage for the job table, with an out-of-core mode above a memory budget.
+
+The job table normally lives in session state as a pandas DataFrame. Once it
+grows past the memory budget it is spilled to a DiskJobTable: a directory of
+Parquet files read through pyarrow.dataset (pyarrow ships with streamlit).
+Filtering, counting and pagination then stream over row groups instead of
+materializing the table. CSV export reads the rows in chunks but still builds
+the whole file in memory.
+
+The budget is read from the JOB_TITLES_MEMORY_BUDGET_MB environment variable
+(default 512 MB per session).
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import weakref
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+MEMORY_BUDGET_MB = float(os.environ.get("JOB_TITLES_MEMORY_BUDGET_MB", 512))
+
+# Rows per Parquet row group and per streamed chunk
+CHUNK_ROWS = 65536
+
+# Small appends (e.g. manual entries) each add a part file; merge them past this count
+MAX_PARTS = 64
+
+
+def frame_memory_bytes(data):
+    """Returns the in-memory size of a DataFrame, including string contents"""
+    return int(data.memory_usage(deep=True).sum())
+
+
+class DiskJobTable:
+    """Append-only, disk-backed job table stored as Parquet part files"""
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.schema = pa.schema([(col, pa.string()) for col in self.columns])
+        self.directory = tempfile.mkdtemp(prefix="job_titles_")
+        self.part_count = 0
+        self.row_count = 0
+        # Remove the files when the session drops the table
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.directory, ignore_errors=True)
+
+    @classmethod
+    def from_frame(cls, data):
+        """Spills an in-memory job table to disk"""
+        table = cls(data.columns)
+        table.append(data)
+        return table
+
+    @property
+    def empty(self):
+        return self.row_count == 0
+
+    def __len__(self):
+        return self.row_count
+
+    def append(self, data):
+        """Appends rows, aligning them to the table's columns as strings"""
+        if data.empty:
+            return
+        aligned = data.reindex(columns=self.columns).fillna("").astype(str)
+        arrow_table = pa.Table.from_pandas(aligned, schema=self.schema, preserve_index=False)
+        pq.write_table(arrow_table, self._part_path(self.part_count), row_group_size=CHUNK_ROWS)
+        self.part_count += 1
+        self.row_count += len(aligned)
+        if self.part_count > MAX_PARTS:
+            self._compact()
+
+    def dataset(self):
+        parts = [self._part_path(number) for number in range(self.part_count)]
+        return ds.dataset(parts, format="parquet", schema=self.schema)
+
+    def iter_frames(self, columns=None, expression=None):
+        """Yields the table (or the rows matching expression) as DataFrame chunks"""
+        scanner = self.dataset().scanner(columns=columns, filter=expression, batch_size=CHUNK_ROWS)
+        for batch in scanner.to_batches():
+            if batch.num_rows:
+                yield batch.to_pandas()
+
+    def close(self):
+        """Deletes the table's files"""
+        self._finalizer()
+
+    def _part_path(self, number):
+        return os.path.join(self.directory, f"part-{number:05d}.parquet")
+
+    def _compact(self):
+        """Rewrites all part files into a single file"""
+        merged_path = os.path.join(self.directory, "merged.tmp")
+        with pq.ParquetWriter(merged_path, self.schema) as writer:
+            for batch in self.dataset().to_batches(batch_size=CHUNK_ROWS):
+                writer.write_batch(batch, row_group_size=CHUNK_ROWS)
+        for number in range(self.part_count):
+            os.remove(self._part_path(number))
+        os.replace(merged_path, self._part_path(0))
+        self.part_count = 1
+
+
+class DiskJobView:
+    """Lazily filtered view over a DiskJobTable"""
+
+    def __init__(self, table, expression=None):
+        self.table = table
+        self.expression = expression
+        self.columns = table.columns
+        self._count = None
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def __len__(self):
+        if self._count is None:
+            if self.expression is None:
+                self._count = len(self.table)
+            else:
+                self._count = self.table.dataset().count_rows(filter=self.expression)
+        return self._count
+
+    def page(self, offset, limit):
+        """Returns rows [offset, offset + limit) of the view as a DataFrame"""
+        stop = min(offset + limit, len(self))
+        if stop <= offset:
+            return pd.DataFrame(columns=self.columns)
+        scanner = self.table.dataset().scanner(filter=self.expression, batch_size=CHUNK_ROWS)
+        return scanner.take(pa.array(range(offset, stop))).to_pandas()
+
+    def iter_frames(self, columns=None):
+        return self.table.iter_frames(columns, self.expression)
+
+    def export_csv(self):
+        """Returns the view as CSV bytes.
+
+        Rows are read chunk by chunk, but the CSV itself is built in memory:
+        Streamlit keeps download payloads in its in-memory media store, so
+        exporting a view needs memory for the whole CSV.
+        """
+        buffer = io.BytesIO()
+        header = True
+        for chunk in self.iter_frames():
+            buffer.write(chunk.to_csv(index=False, header=header).encode('utf-8'))
+            header = False
+        if header:
+            buffer.write(pd.DataFrame(columns=self.columns).to_csv(index=False).encode('utf-8'))
+        return buffer.getvalue()
+
+
+def append_rows(job_data, new_rows, budget_mb=MEMORY_BUDGET_MB):
+    """Appends rows to the job table, spilling it to disk once it exceeds the budget.
+
+    Returns the job table to keep in session state, which is either a DataFrame
+    or a DiskJobTable.
+    """
+    if isinstance(job_data, DiskJobTable):
+        job_data.append(new_rows)
+        return job_data
+
+    combined = pd.concat([job_data, new_rows], ignore_index=True)
+    if frame_memory_bytes(combined) > budget_mb * 1024 * 1024:
+        return DiskJobTable.from_frame(combined)
+    return combined
+
+
+def iter_frames(job_data, columns=None):
+    """Yields the job table as one or more DataFrame chunks, whatever its storage"""
+    if isinstance(job_data, DiskJobTable):
+        yield from job_data.iter_frames(columns)
+    elif columns is None:
+        yield job_data
+    else:
+        yield job_data[columns]
+
+
+def filter_rows(job_data, value_filters, text_filters):
+    """Applies the sidebar filters to the job table.
+
+    value_filters maps a column to the values to keep; text_filters maps a column
+    to a pattern the value must contain. Empty filters are ignored. Returns a
+    DataFrame for in-memory tables and a DiskJobView for out-of-core tables.
+    """
+    value_filters = {col: values for col, values in value_filters.items() if values}
+    text_filters = {col: pattern for col, pattern in text_filters.items() if pattern}
+
+    if isinstance(job_data, DiskJobTable):
+        expression = None
+        for col, values in value_filters.items():
+            condition = ds.field(col).isin(list(values))
+            expression = condition if expression is None else expression & condition
+        for col, pattern in text_filters.items():
+            condition = pc.match_substring_regex(ds.field(col), pattern=pattern)
+            expression = condition if expression is None else expression & condition
+        return DiskJobView(job_data, expression)
+
+    if not value_filters and not text_filters:
+        return job_data
+
+    mask = pd.Series(True, index=job_data.index)
+    for col, values in value_filters.items():
+        mask &= job_data[col].isin(values)
+    for col, pattern in text_filters.items():
+        mask &= job_data[col].str.contains(pattern, na=False)
+    return job_data[mask]
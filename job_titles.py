@@ -0,0 +1,239 @@
+"""Shared job title logic used by the Streamlit app and the local batch API."""
+
+import os
+
+import pandas as pd
+
+from title_templates import load_templates
+
+# Hierarchy levels, ordered from most junior to most senior
+HIERARCHY_LEVELS = [
+    "Officer",
+    "Senior Officer",
+    "Associate Analyst",
+    "Analyst",
+    "Specialist",
+    "Senior Specialist",
+    "Manager",
+    "Senior Manager",
+    "Director",
+    "Senior Director",
+    "Vice President",
+    "Senior Vice President",
+    "Chief (Top of the Org)"
+]
+
+CHIEF_LEVEL = "Chief (Top of the Org)"
+DEFAULT_LEVEL = "Specialist"
+
+# Where a detected hierarchy level came from
+SOURCE_BAND = "Salary band"
+SOURCE_TEXT = "Job text"
+SOURCE_DEFAULT = "Default"
+
+# Final Job Title templates, optionally loaded from the JSON file named by JOB_TITLES_TEMPLATES
+TEMPLATES = load_templates(os.environ.get("JOB_TITLES_TEMPLATES"), CHIEF_LEVEL)
+
+
+def determine_hierarchy_level(job_text):
+    """Analyzes job text to determine the appropriate hierarchy level"""
+    if not job_text or not isinstance(job_text, str):
+        return DEFAULT_LEVEL  # Default fallback
+
+    job_text = job_text.lower()
+
+    # C-level and top executives
+    if any(term in job_text for term in ["chief", "ceo", "cfo", "cio", "cto", "president", "exec vp"]):
+        return CHIEF_LEVEL
+
+    # Senior Vice President
+    if any(term in job_text for term in ["sr vp", "sr. vp", "senior vp", "senior vice president", "sr vice president", "svp"]):
+        return "Senior Vice President"
+
+    # Vice President
+    if any(term in job_text for term in [" vp", "vice president", "vice pres"]) and "senior" not in job_text and "sr" not in job_text:
+        return "Vice President"
+
+    # Senior Director
+    if any(term in job_text for term in ["sr director", "sr. director", "senior director", "sr dir", "sr. dir", "senior dir"]):
+        return "Senior Director"
+
+    # Director
+    if any(term in job_text for term in [" director", " dir "]) and "senior" not in job_text and "sr" not in job_text:
+        return "Director"
+
+    # Senior Manager
+    if any(term in job_text for term in ["sr manager", "sr. manager", "senior manager", "sr mgr", "sr. mgr", "senior mgr"]):
+        return "Senior Manager"
+
+    # Manager
+    if any(term in job_text for term in [" manager", " mgr", "supervisor", "supv", "lead"]) and "senior" not in job_text and "sr" not in job_text:
+        return "Manager"
+
+    # Senior Specialist
+    if any(term in job_text for term in ["sr specialist", "sr. specialist", "senior specialist", "principal", "sr tech", "senior tech", "advisor", "sr prof", "senior prof"]):
+        return "Senior Specialist"
+
+    # Specialist
+    if any(term in job_text for term in ["specialist", "technologist", "tech prof", "engineer", " tech", "technician", "scientist"]):
+        return "Specialist"
+
+    # Senior Analyst
+    if any(term in job_text for term in ["sr analyst", "sr. analyst", "senior analyst"]):
+        return "Analyst"  # We'll use Analyst for Senior Analyst since it's not in our hierarchy levels
+
+    # Analyst
+    if "analyst" in job_text and "associate" not in job_text:
+        return "Analyst"
+
+    # Associate Analyst
+    if any(term in job_text for term in ["assoc analyst", "associate analyst", "jr analyst", "junior analyst"]):
+        return "Associate Analyst"
+
+    # Senior Officer
+    if any(term in job_text for term in ["sr officer", "sr. officer", "senior officer", "sr secretary", "senior secretary", "sr assistant", "senior assistant"]):
+        return "Senior Officer"
+
+    # Officer and other entry-level positions
+    if any(term in job_text for term in ["officer", "clerk", "secretary", "assistant", "coordinator", "rep", "operator", "handler"]):
+        return "Officer"
+
+    # For roles without clear indicators, look for some contextual clues
+    if any(term in job_text for term in ["sr", "senior", "prin", "principal"]):
+        return "Senior Specialist"
+
+    # Default fallback for unrecognized roles
+    return DEFAULT_LEVEL
+
+
+def generate_final_title(division, subdivision, hierarchy_level):
+    """Builds the standardized job title for a single entry"""
+    return TEMPLATES.render_one(division, subdivision, hierarchy_level)
+
+
+def find_column(df, name):
+    """Returns the column of df matching name case-insensitively, or None"""
+    for col in df.columns:
+        if str(col).upper() == name:
+            return col
+    return None
+
+
+def normalize_pernrs(pernrs):
+    """Normalizes PERNR values (e.g. ' 105804') the same way for storage and lookups"""
+    return pernrs.fillna("").astype(str).str.strip()
+
+
+def normalize_bands(bands):
+    """Normalizes salary band values (e.g. ' d3-esg') for lookups"""
+    return bands.fillna("").astype(str).str.strip().str.upper()
+
+
+def load_band_reference(data):
+    """Builds a salary band -> hierarchy level lookup from an uploaded reference table.
+
+    The table needs SAL_BAND and HIERARCHY_LEVEL columns (or exactly two columns
+    in that order). Returns a Series of levels indexed by normalized band.
+    """
+    columns = {str(col).strip().upper().replace(" ", "_"): col for col in data.columns}
+    band_col = columns.get("SAL_BAND")
+    level_col = columns.get("HIERARCHY_LEVEL")
+    if band_col is None or level_col is None:
+        if len(data.columns) != 2:
+            raise ValueError("The band reference needs SAL_BAND and HIERARCHY_LEVEL columns")
+        band_col, level_col = data.columns
+
+    reference = pd.DataFrame({
+        'band': normalize_bands(data[band_col]),
+        'level': data[level_col].fillna("").astype(str).str.strip()
+    })
+    reference = reference[reference['band'] != ""].drop_duplicates()
+
+    unknown_levels = sorted(set(reference['level']) - set(HIERARCHY_LEVELS))
+    if unknown_levels:
+        raise ValueError(f"Unknown hierarchy levels in band reference: {', '.join(unknown_levels)}")
+
+    conflicting = sorted(reference.loc[reference['band'].duplicated(), 'band'].unique())
+    if conflicting:
+        raise ValueError(f"Salary bands mapped to more than one level: {', '.join(conflicting)}")
+
+    return reference.set_index('band')['level']
+
+
+def detect_hierarchy(data, use_auto_detection=True, default_level=DEFAULT_LEVEL, band_levels=None):
+    """Detects the hierarchy level of every row.
+
+    With a band reference (see load_band_reference) the SAL_BAND column is
+    authoritative; the JOB_TEXT rules only run for rows whose band is unknown.
+    Rows with neither a known band nor a job text get default_level. Returns
+    aligned (hierarchy, source) Series.
+    """
+    hierarchy = pd.Series(default_level, index=data.index, dtype=object)
+    source = pd.Series(SOURCE_DEFAULT, index=data.index, dtype=object)
+    if not use_auto_detection:
+        return hierarchy, source
+
+    remaining = pd.Series(True, index=data.index)
+
+    band_col = find_column(data, "SAL_BAND")
+    if band_levels is not None and band_col is not None:
+        # Indexed join against the reference table; unknown bands come back as NaN
+        from_band = normalize_bands(data[band_col]).map(band_levels)
+        known = from_band.notna()
+        hierarchy[known] = from_band[known]
+        source[known] = SOURCE_BAND
+        remaining = ~known
+
+    job_text_col = find_column(data, "JOB_TEXT")
+    if job_text_col is not None:
+        # Rows without a job text keep the default level and source
+        job_texts = data[job_text_col]
+        remaining &= job_texts.notna() & ~job_texts.astype(str).str.strip().isin(["", "nan", "None"])
+    if job_text_col is not None and remaining.any():
+        # Job texts repeat heavily in HR extracts, so classify each distinct text once
+        job_texts = data.loc[remaining, job_text_col].astype(str)
+        levels = {text: determine_hierarchy_level(text) for text in job_texts.unique()}
+        hierarchy[remaining] = job_texts.map(levels)
+        source[remaining] = SOURCE_TEXT
+
+    return hierarchy, source
+
+
+def generate_titles(data, use_auto_detection=True, default_level=DEFAULT_LEVEL, band_levels=None):
+    """Detects hierarchy levels and final titles for a batch of imported rows.
+
+    Expects DIVISION and PSL columns; SAL_BAND (with a band reference) and
+    JOB_TEXT are used for detection when present. Returns a DataFrame aligned
+    with data holding 'Detected Hierarchy', 'Hierarchy Source' and
+    'Final Job Title'.
+    """
+    hierarchy, source = detect_hierarchy(data, use_auto_detection, default_level, band_levels)
+    final_titles = TEMPLATES.render(data['DIVISION'].fillna(""), data['PSL'].fillna(""), hierarchy)
+
+    return pd.DataFrame(
+        {'Detected Hierarchy': hierarchy, 'Hierarchy Source': source, 'Final Job Title': final_titles},
+        index=data.index
+    )
+
+
+def build_entries(data, use_auto_detection=True, default_level=DEFAULT_LEVEL, band_levels=None):
+    """Builds job table rows (without the Created timestamp) for an imported extract.
+
+    Expects DIVISION, PSL, PERNR and JOB_CODE columns; SUBPSL and SAL_BAND are
+    kept when present.
+    """
+    titles = generate_titles(data, use_auto_detection, default_level, band_levels)
+    optional = {}
+    for name in ['SUBPSL', 'SAL_BAND']:
+        col = find_column(data, name)
+        optional[name] = data[col].fillna("").astype(str) if col is not None else ""
+    return pd.DataFrame({
+        'Division': data['DIVISION'].fillna("").astype(str),
+        'Subdivision': data['PSL'].fillna("").astype(str),
+        'Job Title': titles['Detected Hierarchy'],
+        'Final Job Title': titles['Final Job Title'],
+        'PERNR': normalize_pernrs(data['PERNR']),
+        'JOB_CODE': data['JOB_CODE'].astype(str),
+        'SUBPSL': optional['SUBPSL'],
+        'SAL_BAND': optional['SAL_BAND']
+    }).reset_index(drop=True)
@@ -0,0 +1,240 @@
+"""End-to-end rerun latency and concurrency load test for app.py.
+
+Drives the app through Streamlit's AppTest with a scripted user session: load
+the page, add an entry, upload a file, toggle auto-detection, import, apply
+filters and export. Several sessions run at the same time against job tables of
+a configurable size, and the harness reports p50/p95/p99 latency per step (a
+step is one or more reruns) and the memory used by each session.
+
+    python loadtest.py --sessions 4 --rows 100000 --upload-rows 2000 --iterations 3
+
+AppTest is not thread-safe, so each session runs in its own process; latencies
+therefore include CPU contention between sessions but not GIL contention inside
+a single server process. Set JOB_TITLES_MEMORY_BUDGET_MB to exercise the
+out-of-core mode.
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+# Session state key holding the file the scripted user "uploads"
+UPLOAD_STATE_KEY = "_loadtest_upload"
+
+STEPS = ["load", "add entry", "upload", "toggle auto-detection", "import", "filter", "export"]
+
+SAMPLE_DIVISIONS = 25
+SAMPLE_SUBDIVISIONS = 8
+SAMPLE_JOB_TEXTS = ["Clerk", "Sr-Analyst", "Engineer", "Manager", "Sr-Manager", "Director", "Tech-Prof", "VP-Sales"]
+
+
+class ScriptedUpload(io.BytesIO):
+    """Minimal stand-in for Streamlit's UploadedFile"""
+    name = "loadtest_upload.txt"
+
+
+def scripted_file_uploader(label, *args, key=None, **kwargs):
+    """Replaces st.file_uploader, which AppTest cannot drive.
+
+    Only the import uploader (the one without a key) receives the scripted file.
+    """
+    import streamlit as st
+
+    content = st.session_state.get(UPLOAD_STATE_KEY) if key is None else None
+    return ScriptedUpload(content) if content else None
+
+
+def make_job_table(rows, seed=0):
+    """Builds a synthetic job table with the app's columns"""
+    from job_titles import HIERARCHY_LEVELS
+
+    rng = np.random.default_rng(seed)
+    division = pd.Series(rng.integers(0, SAMPLE_DIVISIONS, rows)).map(lambda i: f"Division-{i}")
+    subdivision = pd.Series(rng.integers(0, SAMPLE_SUBDIVISIONS, rows)).map(lambda i: f"PSL-{i}")
+    level = pd.Series(rng.integers(0, len(HIERARCHY_LEVELS), rows)).map(lambda i: HIERARCHY_LEVELS[i])
+    return pd.DataFrame({
+        'Division': division,
+        'Subdivision': subdivision,
+        'Job Title': level,
+        'Final Job Title': division + " " + subdivision + " " + level,
+        'PERNR': pd.Series(np.arange(1, rows + 1)).astype(str),
+        'JOB_CODE': "A409-ESG",
+        'SUBPSL': "SUB",
+        'SAL_BAND': "D3-ESG",
+        'Created': "2024-01-01 09:00"
+    })
+
+
+def make_upload(rows, first_pernr):
+    """Builds a space-separated extract with PERNRs starting at first_pernr"""
+    lines = ["PERNR JOB_TEXT DIVISION PSL SUBPSL SAL_BAND JOB_CODE"]
+    for i in range(rows):
+        job_text = SAMPLE_JOB_TEXTS[i % len(SAMPLE_JOB_TEXTS)]
+        lines.append(
+            f"{first_pernr + i} {job_text} Division-{i % SAMPLE_DIVISIONS} PSL-{i % SAMPLE_SUBDIVISIONS} "
+            f"SUB D3-ESG A409-ESG"
+        )
+    return "\n".join(lines).encode("utf-8")
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_session(session_id, rows, upload_rows, iterations, timeout):
+    """Runs one scripted user session and returns its step timings and memory use"""
+    logging.disable(logging.WARNING)
+    import streamlit
+    from streamlit.testing.v1 import AppTest
+    from job_store import DiskJobTable, filter_rows, frame_memory_bytes
+
+    streamlit.file_uploader = scripted_file_uploader
+    baseline_mb = peak_rss_mb()
+    timings = []
+
+    def timed(step, action):
+        started = time.perf_counter()
+        action()
+        timings.append((step, time.perf_counter() - started))
+        if at.exception:
+            raise RuntimeError(f"Session {session_id} failed at '{step}': {at.exception[0].value}")
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.session_state["job_data"] = make_job_table(rows, seed=session_id)
+    timed("load", at.run)
+
+    for iteration in range(iterations):
+        def add_entry():
+            main_inputs = {w.label: w for w in at.main.text_input}
+            main_inputs["Division"].input(f"Division-{iteration}")
+            main_inputs["Subdivision"].input("PSL-0")
+            main_inputs["PERNR"].input(str(9_000_000 + session_id * 1000 + iteration))
+            main_inputs["JOB_CODE"].input("A409-ESG")
+            next(b for b in at.button if "Add Job Title" in b.label).click().run()
+        timed("add entry", add_entry)
+
+        def upload():
+            first_pernr = 10_000_000 + (session_id * iterations + iteration) * upload_rows
+            at.session_state[UPLOAD_STATE_KEY] = make_upload(upload_rows, first_pernr)
+            at.run()
+        timed("upload", upload)
+
+        def toggle_auto_detection():
+            checkbox = next(c for c in at.checkbox if c.label.startswith("Use automatic hierarchy detection"))
+            checkbox.uncheck().run()
+            checkbox = next(c for c in at.checkbox if c.label.startswith("Use automatic hierarchy detection"))
+            checkbox.check().run()
+        timed("toggle auto-detection", toggle_auto_detection)
+
+        def import_file():
+            next(b for b in at.button if "Import All" in b.label).click().run()
+            at.session_state[UPLOAD_STATE_KEY] = None
+        timed("import", import_file)
+
+        def apply_filters():
+            at.sidebar.multiselect[0].select(f"Division-{iteration % SAMPLE_DIVISIONS}").run()
+            next(w for w in at.sidebar.text_input if w.label == "PERNR").input("1").run()
+        timed("filter", apply_filters)
+
+        def export():
+            # The CSV payload is built while the page renders; on-disk tables build it on demand
+            at.sidebar.multiselect[0].set_value([])
+            next(w for w in at.sidebar.text_input if w.label == "PERNR").input("")
+            at.run()
+            job_data = at.session_state["job_data"]
+            if isinstance(job_data, DiskJobTable):
+                filter_rows(job_data, {}, {}).export_csv()
+        timed("export", export)
+
+    job_data = at.session_state["job_data"]
+    return {
+        'session': session_id,
+        'timings': timings,
+        'rows': len(job_data),
+        'on_disk': isinstance(job_data, DiskJobTable),
+        'table_mb': 0.0 if isinstance(job_data, DiskJobTable) else frame_memory_bytes(job_data) / 1024 / 1024,
+        'peak_rss_mb': peak_rss_mb(),
+        'session_rss_mb': peak_rss_mb() - baseline_mb,
+    }
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of an already sorted list"""
+    index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(results):
+    """Aggregates step timings (in ms) across all sessions"""
+    by_step = {step: [] for step in STEPS}
+    for result in results:
+        for step, seconds in result['timings']:
+            by_step[step].append(seconds * 1000)
+    by_step["all steps"] = [value for values in by_step.values() for value in values]
+
+    latency = {}
+    for step, values in by_step.items():
+        ordered = sorted(values)
+        latency[step] = {
+            'count': len(ordered),
+            'p50_ms': round(percentile(ordered, 50), 1),
+            'p95_ms': round(percentile(ordered, 95), 1),
+            'p99_ms': round(percentile(ordered, 99), 1),
+            'max_ms': round(ordered[-1], 1),
+        }
+    return latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test Streamlit reruns of app.py")
+    parser.add_argument("--sessions", type=int, default=4, help="Concurrent sessions")
+    parser.add_argument("--rows", type=int, default=50000, help="Rows in each session's job table at start")
+    parser.add_argument("--upload-rows", type=int, default=1000, help="Rows in each uploaded file")
+    parser.add_argument("--iterations", type=int, default=3, help="Times each session repeats the scenario")
+    parser.add_argument("--timeout", type=float, default=300, help="Timeout in seconds for a single rerun")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.sessions) as executor:
+        futures = [
+            executor.submit(run_session, session_id, args.rows, args.upload_rows, args.iterations, args.timeout)
+            for session_id in range(args.sessions)
+        ]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started
+
+    latency = summarize(results)
+
+    print(f"{args.sessions} sessions x {args.iterations} iterations, {args.rows} starting rows, "
+          f"{args.upload_rows} rows per upload ({elapsed:.1f}s total)\n")
+    print(f"{'step':<24}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for step, stats in latency.items():
+        print(f"{step:<24}{stats['count']:>7}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['max_ms']:>10}")
+
+    print(f"\n{'session':<10}{'rows':>10}{'storage':>10}{'table MB':>10}{'session MB':>12}{'peak RSS MB':>13}")
+    for result in results:
+        storage = "disk" if result['on_disk'] else "memory"
+        print(f"{result['session']:<10}{result['rows']:>10}{storage:>10}{result['table_mb']:>10.1f}"
+              f"{result['session_rss_mb']:>12.1f}{result['peak_rss_mb']:>13.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({'config': vars(args), 'latency': latency, 'sessions': [
+                {key: value for key, value in result.items() if key != 'timings'} for result in results
+            ]}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Compiled, vectorized templates for the Final Job Title.
+
+Templates use {division}, {subdivision} and {level} placeholders, e.g.
+"{division} {subdivision} {level}". Each template is compiled once into its
+literal and field parts. Rendering a batch factorizes the (division,
+subdivision, level) combinations, renders every distinct combination once with
+column-wide string concatenation and maps the results back onto the rows.
+
+A template configuration is a JSON file such as:
+
+    {
+        "template": "{division} {subdivision} {level}",
+        "chief_template": "Chief {division} Officer",
+        "abbreviations": {"Senior": "Sr.", "Vice President": "VP"},
+        "divisions": {
+            "Drilling & Evaluation": {"template": "{division} {subdivision} {level} (D&E)"},
+            "Finance": {"chief_template": "Chief Financial Officer"}
+        }
+    }
+
+Every key is optional. Divisions listed under "divisions" override the
+template and/or chief template for their rows. Abbreviations are applied to
+whole words in the field values before rendering.
+"""
+
+import json
+import re
+import string
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_TEMPLATE = "{division} {subdivision} {level}"
+DEFAULT_CHIEF_TEMPLATE = "Chief {division} Officer"
+
+FIELDS = ('division', 'subdivision', 'level')
+
+
+class TitleTemplate:
+    """A title pattern compiled into literal and field parts"""
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.parts = []
+        for literal, field, _, _ in string.Formatter().parse(pattern):
+            if literal:
+                self.parts.append((literal, None))
+            if field is not None:
+                if field not in FIELDS:
+                    raise ValueError(f"Unknown field '{{{field}}}' in title template: {pattern}")
+                self.parts.append((None, field))
+
+    def render(self, values):
+        """Renders the template over columns; values maps each field to a string Series"""
+        index = values['division'].index
+        result = pd.Series("", index=index, dtype=object)
+        for literal, field in self.parts:
+            result = result + (literal if field is None else values[field])
+        return result
+
+    def render_one(self, values):
+        """Renders the template for a single entry; values maps each field to a string"""
+        return "".join(literal if field is None else values[field] for literal, field in self.parts)
+
+
+class TitleTemplates:
+    """Default, Chief and per-division title templates with optional abbreviations"""
+
+    def __init__(self, chief_level, template=DEFAULT_TEMPLATE, chief_template=DEFAULT_CHIEF_TEMPLATE,
+                 abbreviations=None, divisions=None):
+        self.chief_level = chief_level
+        self.template = TitleTemplate(template)
+        self.chief_template = TitleTemplate(chief_template)
+        self.abbreviations = dict(abbreviations or {})
+        self.abbreviation_pattern = None
+        if self.abbreviations:
+            # Longest first so "Senior Vice President" wins over "Senior"
+            words = sorted(self.abbreviations, key=len, reverse=True)
+            self.abbreviation_pattern = re.compile(r"\b(?:" + "|".join(re.escape(word) for word in words) + r")\b")
+
+        # {division: (template, chief template)}
+        self.division_templates = {}
+        for division, overrides in (divisions or {}).items():
+            self.division_templates[division] = (
+                TitleTemplate(overrides.get('template', template)),
+                TitleTemplate(overrides.get('chief_template', chief_template))
+            )
+
+    def _abbreviate(self, text):
+        if self.abbreviation_pattern is None:
+            return text
+        return self.abbreviation_pattern.sub(lambda match: self.abbreviations[match.group(0)], text)
+
+    def _templates_for(self, division):
+        return self.division_templates.get(division, (self.template, self.chief_template))
+
+    def render_one(self, division, subdivision, level):
+        """Builds the Final Job Title for a single entry"""
+        template, chief_template = self._templates_for(division)
+        values = {
+            'division': self._abbreviate(str(division)),
+            'subdivision': self._abbreviate(str(subdivision)),
+            'level': self._abbreviate(str(level))
+        }
+        return (chief_template if level == self.chief_level else template).render_one(values)
+
+    def render(self, division, subdivision, level):
+        """Builds Final Job Titles for aligned Series of divisions, subdivisions and levels"""
+        index = division.index
+        if len(index) == 0:
+            return pd.Series([], index=index, dtype=object)
+
+        # Render each distinct (division, subdivision, level) combination once: factorize
+        # each column, pack the three codes into one integer key and factorize that
+        column_codes = []
+        column_uniques = []
+        for column in (division, subdivision, level):
+            column_code, uniques = pd.factorize(column, use_na_sentinel=False)
+            column_codes.append(column_code.astype(np.int64))
+            column_uniques.append(np.array([str(value) for value in uniques], dtype=object))
+        subdivision_count = len(column_uniques[1])
+        level_count = len(column_uniques[2])
+        key = (column_codes[0] * subdivision_count + column_codes[1]) * level_count + column_codes[2]
+        codes, combo_keys = pd.factorize(key)
+
+        combo_codes = [
+            combo_keys // (subdivision_count * level_count),
+            combo_keys // level_count % subdivision_count,
+            combo_keys % level_count
+        ]
+        raw = {
+            field: pd.Series(column_uniques[i][combo_codes[i]], dtype=object)
+            for i, field in enumerate(FIELDS)
+        }
+        values = raw
+        if self.abbreviation_pattern is not None:
+            values = {field: column.map(self._abbreviate) for field, column in raw.items()}
+        is_chief = raw['level'] == self.chief_level
+
+        titles = self.template.render(values).where(~is_chief, self.chief_template.render(values))
+        for override, (template, chief_template) in self.division_templates.items():
+            in_division = raw['division'] == override
+            if in_division.any():
+                subset = {field: column[in_division] for field, column in values.items()}
+                titles[in_division] = template.render(subset).where(
+                    ~is_chief[in_division], chief_template.render(subset)
+                )
+
+        return pd.Series(titles.to_numpy()[codes], index=index, dtype=object)
+
+
+def load_templates(path, chief_level):
+    """Loads a template configuration from a JSON file, or the defaults when path is empty"""
+    if not path:
+        return TitleTemplates(chief_level)
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    return TitleTemplates(chief_level, **config)
@@ -0,0 +1,134 @@
+"""Vectorized validation of imported job data.
+
+All checks run as column-wide operations over the whole batch and are collected
+into a single report with one row per issue, which the app shows and offers as
+a download.
+"""
+
+import pandas as pd
+
+from job_titles import normalize_pernrs
+
+# Employee IDs are purely numeric, e.g. 105804
+PERNR_PATTERN = r"^\d+$"
+
+# Job codes look like A409-ESG, R505-ESG or BD14-ESG
+JOB_CODE_PATTERN = r"^[A-Za-z]+\d+-[A-Za-z]+$"
+
+REQUIRED_FIELDS = ['DIVISION', 'PSL']
+
+REPORT_COLUMNS = ['Line', 'PERNR', 'Severity', 'Column', 'Issue']
+
+# Rows with errors are excluded from the import; warnings are informational
+ERROR = 'Error'
+WARNING = 'Warning'
+
+
+def _clean(column):
+    """Returns a stripped string version of a column with missing values as empty strings"""
+    return column.where(column.notna(), "").astype(str).str.strip()
+
+
+def _line_numbers(data, line_numbers):
+    """Returns the source line of every row.
+
+    Without line_numbers, rows are numbered as if the header were line 1 and
+    every following line held one row, which only matches files without blank
+    lines or multi-line values.
+    """
+    if line_numbers is None:
+        return pd.Series(range(2, len(data) + 2), index=data.index)
+    return pd.Series(list(line_numbers), index=data.index)
+
+
+def _issues(mask, lines, pernr, column, issue, severity=ERROR):
+    """Builds report rows for every row selected by mask"""
+    if not mask.any():
+        return None
+    issue_values = issue[mask] if isinstance(issue, pd.Series) else issue
+    return pd.DataFrame({
+        'Line': lines[mask],
+        'PERNR': pernr[mask],
+        'Severity': severity,
+        'Column': column,
+        'Issue': issue_values
+    })
+
+
+def validate_import(data, existing_pernrs=None, line_numbers=None, token_counts=None,
+                    expected_fields=None, skipped_lines=None):
+    """Validates an import batch and returns a report DataFrame of issues.
+
+    data must already have DIVISION, PSL, PERNR and JOB_CODE columns.
+    existing_pernrs is a set of PERNRs already in the job table. line_numbers,
+    token_counts and expected_fields come from the space-separated tokenizer and
+    allow padded or truncated rows to be reported; skipped_lines lists
+    (line, token count) pairs for rows the tokenizer dropped entirely. For
+    regular CSV files, pass the line numbers from importer.csv_line_numbers.
+    """
+    lines = _line_numbers(data, line_numbers)
+    pernr = normalize_pernrs(data['PERNR'])
+    found = []
+
+    # PERNR format
+    found.append(_issues(~pernr.str.match(PERNR_PATTERN), lines, pernr, 'PERNR', 'PERNR is missing or not numeric'))
+
+    # Required fields
+    for field in REQUIRED_FIELDS:
+        found.append(_issues(_clean(data[field]) == "", lines, pernr, field, f'{field} is empty'))
+
+    # JOB_CODE pattern
+    job_code = _clean(data['JOB_CODE'])
+    found.append(_issues(
+        ~job_code.str.match(JOB_CODE_PATTERN), lines, pernr, 'JOB_CODE',
+        'JOB_CODE does not match the expected pattern (e.g. A409-ESG)'
+    ))
+
+    # Duplicate PERNR within the file, pointing back at the first occurrence
+    has_pernr = pernr != ""
+    duplicated = pernr.duplicated(keep='first') & has_pernr
+    if duplicated.any():
+        first_line = lines.groupby(pernr).transform('min')
+        found.append(_issues(
+            duplicated, lines, pernr, 'PERNR',
+            'Duplicate PERNR in file (first seen on line ' + first_line.astype(str) + ')'
+        ))
+
+    # PERNR already present in the job table (hash lookup)
+    if existing_pernrs:
+        found.append(_issues(
+            pernr.isin(existing_pernrs) & has_pernr, lines, pernr, 'PERNR',
+            'PERNR already exists in the job table'
+        ))
+
+    # Rows the tokenizer padded or truncated to fit the header
+    if token_counts is not None and expected_fields:
+        counts = pd.Series(list(token_counts), index=data.index)
+        found.append(_issues(
+            counts < expected_fields, lines, pernr, '',
+            'Row had ' + counts.astype(str) + f' fields, padded to {expected_fields}', WARNING
+        ))
+        found.append(_issues(
+            counts > expected_fields, lines, pernr, '',
+            'Row had ' + counts.astype(str) + f' fields, truncated to {expected_fields}', WARNING
+        ))
+
+    if skipped_lines:
+        found.append(pd.DataFrame({
+            'Line': [line for line, _ in skipped_lines],
+            'PERNR': "",
+            'Severity': WARNING,
+            'Column': "",
+            'Issue': [f'Row had only {count} fields and was skipped' for _, count in skipped_lines]
+        }))
+
+    found = [issues for issues in found if issues is not None]
+    if not found:
+        return pd.DataFrame(columns=REPORT_COLUMNS)
+    return pd.concat(found, ignore_index=True).sort_values('Line', kind='stable').reset_index(drop=True)
+
+
+def invalid_rows(data, report, line_numbers=None):
+    """Returns a boolean mask over data marking rows with at least one error in the report"""
+    lines = _line_numbers(data, line_numbers)
+    return lines.isin(report.loc[report['Severity'] == ERROR, 'Line'])